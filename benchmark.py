@@ -0,0 +1,312 @@
+"""
+Headless benchmarks for the fractal machinery, so that changes to
+fractal_base.py, drawing.py and matrix.py can be checked for speed. Doesn't
+need Processing - the turtle draws onto a NullGraphics.
+
+The time taken to import the registry is measured once, in a fresh
+interpreter. Then for each fractal in the registry, and each depth in a range
+around its default number of iterations, this measures separately:
+- construction time of the LSystemFractal (recorded, but not compared)
+- time taken by the static analysis (building the transition matrix)
+- symbols per second out of generate()
+- turtle steps per second out of draw()
+- the latency of project_steps()
+- the peak memory used while drawing
+
+Each timing is the best of several runs, and anything quick is timed as a
+loop of calls, like timeit. Results are written as JSON, and can be compared
+against a previous run:
+
+    python benchmark.py -o baseline.json
+    # ... make some changes ...
+    python benchmark.py -o new.json --baseline baseline.json --threshold 0.2
+
+which exits with a non-zero status if anything got more than 20% worse.
+Timings that were under the noise floor (--noise-floor) in both runs aren't
+compared, as they vary by more than any sensible threshold from run to run.
+"""
+
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser
+from collections import deque
+from timeit import default_timer as timer
+
+from drawing import ProcessingTurtle, NullGraphics
+from fractal_base import LSystemFractal
+from fractals import fractal_registry
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Metrics where a bigger number is better. Everything else is a duration, where
+# a smaller number is better.
+THROUGHPUT_METRICS = ["generate_symbols_per_second", "turtle_steps_per_second"]
+# What each throughput metric is a count of, so that it can be turned back into
+# a duration
+THROUGHPUT_COUNTS = {"generate_symbols_per_second": "symbols",
+                     "turtle_steps_per_second": "steps"}
+# construction_seconds is recorded but not compared: construction is lazy, so
+# it's just the time to build a tuple, and anything that changes that changes
+# analysis_seconds too.
+LATENCY_METRICS = ["analysis_seconds", "project_steps_seconds"]
+
+# Shortest time a loop of calls is run for when timing something quick
+MIN_LOOP_SECONDS = 0.02
+
+# Timings below this many seconds aren't compared by default
+NOISE_FLOOR = 1e-3
+
+# How many seconds the registry import may get slower by before it counts as a
+# regression, whatever the threshold. Starting a fresh interpreter each time
+# makes this vary by several milliseconds.
+STARTUP_TOLERANCE = 0.01
+
+def time_call(func, repeat=1, number=1):
+    """
+    Return the best time per call out of `repeat` loops of `number` calls of
+    func(). Like timeit, garbage collection is turned off while timing, as
+    otherwise collections land in arbitrary runs.
+    """
+    best = None
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = timer()
+            for _ in range(number):
+                func()
+            elapsed = (timer() - start) / number
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best
+
+def time_quick_call(func, repeat):
+    """
+    Like time_call(), but for things too quick to time with a single call. The
+    number of calls in each loop is doubled until a loop takes at least
+    MIN_LOOP_SECONDS.
+    """
+    number = 1
+    while time_call(func, 1, number) * number < MIN_LOOP_SECONDS:
+        number *= 2
+    return time_call(func, repeat, number)
+
+def measure_peak_memory(func, index, depth):
+    """
+    Return the peak memory usage in bytes of drawing the fractal at `index` in
+    the registry at `depth`, along with a string describing how it was
+    measured. With tracemalloc (Python 3) this is the peak of Python
+    allocations during a call of func(). Otherwise, the maximum resident set
+    size only ever goes up over the life of a process, so the drawing is done
+    in a fresh interpreter, and this is how much its maximum resident set size
+    went up by.
+    """
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1], "tracemalloc"
+        finally:
+            tracemalloc.stop()
+    if resource is None:
+        return None, None
+    code = ("import resource\n"
+            "from collections import deque\n"
+            "from drawing import ProcessingTurtle, NullGraphics\n"
+            "from fractals import fractal_registry\n"
+            "before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+            "turtle = ProcessingTurtle(NullGraphics())\n"
+            "deque(fractal_registry[{}].draw(turtle, {}, 1), maxlen=0)\n"
+            "after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+            "print(after - before)\n").format(index, depth)
+    here = os.path.dirname(os.path.abspath(__file__))
+    # Linux reports this in kilobytes
+    return (int(subprocess.check_output([sys.executable, "-c", code],
+                                        cwd=here)) * 1024,
+            "maxrss-subprocess")
+
+def benchmark_fractal(fractal, index, depth, repeat):
+    """
+    Run all measurements for the fractal at `index` in the registry at a
+    single depth, returning a dictionary of results.
+    """
+    symbols = [0]
+    def consume_symbols():
+        symbols[0] = sum(1 for _ in fractal.generate(depth))
+    generate_seconds = time_quick_call(consume_symbols, repeat)
+
+    steps = [0]
+    def consume_steps():
+        turtle = ProcessingTurtle(NullGraphics())
+        steps[0] = sum(1 for _ in fractal.draw(turtle, depth, 1))
+    draw_seconds = time_quick_call(consume_steps, repeat)
+
+    def draw_quietly():
+        turtle = ProcessingTurtle(NullGraphics())
+        deque(fractal.draw(turtle, depth, 1), maxlen=0)
+    peak_memory, peak_memory_source = measure_peak_memory(draw_quietly,
+                                                          index, depth)
+
+    return {
+        "name": fractal.name,
+        "depth": depth,
+        "symbols": symbols[0],
+        "steps": steps[0],
+        "construction_seconds": time_quick_call(
+            lambda: LSystemFractal(*fractal), repeat),
+        "analysis_seconds": time_quick_call(
+            lambda: LSystemFractal(*fractal).generate_transition_matrix(),
+            repeat),
+        "generate_symbols_per_second": symbols[0] / max(generate_seconds,
+                                                        1e-9),
+        "turtle_steps_per_second": steps[0] / max(draw_seconds, 1e-9),
+        "project_steps_seconds": time_quick_call(
+            lambda: fractal.project_steps(depth), repeat),
+        "peak_memory_bytes": peak_memory,
+        "peak_memory_source": peak_memory_source,
+    }
+
+def measure_startup(repeat):
+    """
+    Return the best time out of `repeat` imports of the fractal registry, each
+    in a fresh interpreter. Only the import itself is timed, not the
+    interpreter starting up.
+    """
+    code = ("from timeit import default_timer as timer\n"
+            "start = timer()\n"
+            "import fractals\n"
+            "print(timer() - start)\n")
+    here = os.path.dirname(os.path.abspath(__file__))
+    return min(float(subprocess.check_output([sys.executable, "-c", code],
+                                             cwd=here))
+               for _ in range(repeat))
+
+def run_benchmarks(indices, depth_range, repeat, verbose=True):
+    results = []
+    for ind in indices:
+        fractal = fractal_registry[ind]
+        low, high = depth_range
+        depths = sorted(set(max(fractal.iterations + delta, 1)
+                            for delta in range(low, high + 1)))
+        for depth in depths:
+            result = benchmark_fractal(fractal, ind, depth, repeat)
+            result["index"] = ind
+            results.append(result)
+            if verbose:
+                print("{:2} {:40} depth {:2}: {:10.0f} symbols/s "
+                      "{:10.0f} steps/s".format(
+                          ind, fractal.name, depth,
+                          result["generate_symbols_per_second"],
+                          result["turtle_steps_per_second"]))
+    return {
+        "interpreter": "{} {}".format(platform.python_implementation(),
+                                      platform.python_version()),
+        "startup_seconds": measure_startup(repeat),
+        "results": results,
+    }
+
+def compare(baseline, current, threshold, noise_floor=NOISE_FLOOR):
+    """
+    Compare two sets of results, and return a list of strings describing each
+    metric that got worse by more than `threshold` (as a fraction). Entries are
+    matched up by fractal name and depth, and entries only in one of the two
+    are ignored. So are metrics where the time taken was under `noise_floor`
+    seconds in both, and changes in startup time of under STARTUP_TOLERANCE.
+    """
+    old_results = dict(((r["name"], r["depth"]), r)
+                       for r in baseline["results"])
+    regressions = []
+    old_startup = baseline.get("startup_seconds")
+    new_startup = current.get("startup_seconds")
+    if old_startup and new_startup is not None:
+        change = 1.0 * new_startup / old_startup - 1.0
+        if change > threshold and new_startup - old_startup > STARTUP_TOLERANCE:
+            regressions.append(
+                "registry import got {:.1%} worse ({:.4g} -> {:.4g})"
+                .format(change, old_startup, new_startup))
+    for new in current["results"]:
+        old = old_results.get((new["name"], new["depth"]))
+        if old is None:
+            continue
+        for metric in THROUGHPUT_METRICS + LATENCY_METRICS:
+            old_value, new_value = old.get(metric), new.get(metric)
+            if not old_value or not new_value:
+                continue
+            if metric in THROUGHPUT_METRICS:
+                count = THROUGHPUT_COUNTS[metric]
+                old_seconds = old[count] / old_value
+                new_seconds = new[count] / new_value
+            else:
+                old_seconds, new_seconds = old_value, new_value
+            if max(old_seconds, new_seconds) < noise_floor:
+                continue
+            if metric in THROUGHPUT_METRICS:
+                change = 1.0 - 1.0 * new_value / old_value
+            else:
+                change = 1.0 * new_value / old_value - 1.0
+            if change > threshold:
+                regressions.append(
+                    "{} (depth {}): {} got {:.1%} worse ({:.4g} -> {:.4g})"
+                    .format(new["name"], new["depth"], metric, change,
+                            old_value, new_value))
+    return regressions
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output",
+            help="file to write the results to as JSON")
+    parser.add_argument("-b", "--baseline",
+            help="JSON results of a previous run to compare against")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1,
+            help="fraction by which a metric may get worse before it counts "
+                 "as a regression (default: %(default)s)")
+    parser.add_argument("-n", "--noise-floor", type=float, default=NOISE_FLOOR,
+            help="timings under this many seconds in both runs aren't "
+                 "compared (default: %(default)s)")
+    parser.add_argument("-f", "--fractals", type=int, nargs="+",
+            help="indices into the fractal registry to benchmark "
+                 "(default: all)")
+    parser.add_argument("-d", "--depths", type=int, nargs=2, default=[-2, 0],
+            metavar=("LOW", "HIGH"),
+            help="range of depths to run, relative to each fractal's default "
+                 "number of iterations (default: %(default)s)")
+    parser.add_argument("-r", "--repeat", type=int, default=5,
+            help="number of repetitions of each timing, of which the best is "
+                 "taken (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    indices = (args.fractals if args.fractals is not None
+               else range(len(fractal_registry)))
+    current = run_benchmarks(indices, args.depths, args.repeat)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold,
+                              args.noise_floor)
+        for regression in regressions:
+            print(regression)
+        if regressions:
+            return 1
+        print("no regressions beyond {:.0%}".format(args.threshold))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+"""
+Shims to paper over the differences between Python 2 and 3, so that the core
+modules (everything except the sketch itself) run unchanged on Jython, which
+is what Processing uses, as well as on CPython 3 and PyPy3, which are a lot
+faster for headless jobs.
+"""
+
+try:
+    from itertools import izip, imap
+except ImportError:
+    izip = zip
+    imap = map
+
+try:
+    xrange = xrange
+except NameError:
+    xrange = range
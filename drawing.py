@@ -4,6 +4,8 @@ The drawing layer of abstraction for Processing.
 
 from math import sin, cos, pi, radians
 
+from instrumentation import InstrumentedGraphics
+
 class ProcessingTurtle(object):
     """
     A little turtle class to execute the actual drawing of an L-system. Mostly
@@ -11,8 +13,14 @@ class ProcessingTurtle(object):
 
     This is a slightly unconventional kind of turtle - see the documentation for
     LSystemFractal.
+
+    If a DrawStats object is passed in, the turtle counts its state saves and
+    restores, and counts and times its calls to the graphics object.
     """
-    def __init__(self, graphics):
+    def __init__(self, graphics, stats=None):
+        self.stats = stats
+        if stats is not None:
+            graphics = InstrumentedGraphics(graphics, stats)
         self.graphics = graphics
         self.x = 0
         self.y = 0
@@ -71,11 +79,118 @@ class ProcessingTurtle(object):
         self._pendown = True
 
     def save_state(self):
+        if self.stats is not None:
+            self.stats.pushes += 1
         self.state_stack.append(
                 (self.x, self.y, self.heading, self._pendown))
 
     def restore_state(self):
+        if self.stats is not None:
+            self.stats.pops += 1
         self.x, self.y, self.heading, self._pendown = self.state_stack.pop()
 
     def sethue(self, h):
         self.graphics.stroke(h, 255, 255)
+
+    def get_state(self):
+        """
+        The complete state of the turtle, as something that can go in JSON.
+        """
+        return {"x": self.x, "y": self.y, "heading": self.heading,
+                "pendown": self._pendown, "input_scale": self.input_scale,
+                "output_scale": self.output_scale,
+                "state_stack": [list(state) for state in self.state_stack]}
+
+    def set_state(self, state):
+        """
+        Restore a state from get_state().
+        """
+        self.x = state["x"]
+        self.y = state["y"]
+        self.heading = state["heading"]
+        self._pendown = state["pendown"]
+        self.input_scale = state["input_scale"]
+        self.output_scale = state["output_scale"]
+        self.state_stack = [tuple(saved) for saved in state["state_stack"]]
+
+class DedupTurtle(ProcessingTurtle):
+    """
+    A ProcessingTurtle that doesn't draw the same line twice. Lots of fractals
+    (Sierpinski's Carpet, the Cantor Set, anything that backtracks with "[" and
+    "]") retrace the same unit segments over and over, which just costs time
+    and gives the same picture.
+
+    Endpoints are snapped to a grid of `resolution` points per unit step before
+    being compared, which absorbs floating point error. For fractals with
+    lattice angles (multiples of 90, or of 60 on a triangular lattice) this is
+    exact, and for other angles segments only get merged if they really do
+    coincide to within the grid spacing. Segments are stored with their
+    endpoints in sorted order, so that going back over a line in the other
+    direction also counts as a retrace.
+
+    Each segment is packed into a single int, which takes up a fraction of the
+    memory of a tuple of its endpoints. Snapped coordinates are assumed to fit
+    in `coordinate_bits` bits, signed; segments that don't are stored as
+    tuples instead, so they can't collide with anything.
+
+    Skipped lines still move the turtle, so the caller's hue and step counters
+    are unaffected.
+    """
+    resolution = 1000
+    coordinate_bits = 32
+
+    def __init__(self, graphics, stats=None):
+        super(DedupTurtle, self).__init__(graphics, stats)
+        self.drawn_segments = set()
+        self.lines_drawn = 0
+        self.lines_skipped = 0
+
+    def _snap(self, x, y):
+        scale = self.input_scale * self.resolution
+        return int(round(x * scale)), int(round(y * scale))
+
+    def setpos(self, nx, ny):
+        if self._pendown:
+            ax, ay = self._snap(self.x, self.y)
+            bx, by = self._snap(nx, ny)
+            if (bx, by) < (ax, ay):
+                ax, ay, bx, by = bx, by, ax, ay
+            segment = self._pack(ax, ay, bx, by)
+            if segment in self.drawn_segments:
+                self.lines_skipped += 1
+                self.jump(nx, ny)
+                return
+            self.drawn_segments.add(segment)
+            self.lines_drawn += 1
+        super(DedupTurtle, self).setpos(nx, ny)
+
+    def _pack(self, ax, ay, bx, by):
+        """
+        Pack a snapped segment into one int, with each coordinate offset to be
+        non-negative.
+        """
+        bits = self.coordinate_bits
+        offset = 1 << (bits - 1)
+        if not (-offset <= min(ax, ay, bx, by)
+                and max(ax, ay, bx, by) < offset):
+            return ax, ay, bx, by
+        return ((ax + offset) << 3 * bits | (ay + offset) << 2 * bits
+                | (bx + offset) << bits | (by + offset))
+
+    def overdraw_ratio(self):
+        """
+        The fraction of lines requested so far that were retraces.
+        """
+        total = self.lines_drawn + self.lines_skipped
+        return 1.0 * self.lines_skipped / total if total else 0.0
+
+class NullGraphics(object):
+    """
+    Graphics object that just throws everything away, so that turtles can be
+    run without Processing.
+    """
+    def line(self, *args):
+        pass
+
+    def stroke(self, *args):
+        pass
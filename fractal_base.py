@@ -12,7 +12,9 @@ from collections import namedtuple, Counter
 from itertools import chain, starmap
 from pprint import pformat
 from textwrap import dedent
+from timeit import default_timer as timer
 
+from compat import xrange
 from matrix import Matrix
 
 LSystemFractalTuple = namedtuple(
@@ -60,15 +62,30 @@ class LSystemFractal(LSystemFractalTuple):
                 the number of steps taken by that rule.
                 It would be appreciated if the number of rules and drawing
                 category is invariant for turtle and depth inputs, for static
-                analysis purposes.
+                analysis purposes. If draw_rules has a `symbol_steps` mapping
+                of each symbol to its number of steps, that's used for the
+                analysis, rather than calling the rules on a DummyTurtle.
     size_func:  A function taking an integer (the number of iterations) and
                 returning the expected largest dimension of the fractal (height
                 or width), given in unit drawing steps.
     iterations: The default number of iterations to perform.
     """
-    def __init__(self, *args, **kwargs):
-        super(LSystemFractalTuple, self).__init__(*args, **kwargs)
-        self.generate_transition_matrix()
+    # Attributes filled in by generate_transition_matrix(). This analysis isn't
+    # free, so it's deferred until one of them is first needed, which means
+    # defining a fractal (and importing the whole registry) is cheap.
+    _ANALYSIS_ATTRIBUTES = frozenset(
+            ["symbols", "transition_matrix", "initial_vector", "symbol_steps"])
+
+    def __getattr__(self, name):
+        """
+        Only called when normal attribute lookup fails, so this runs the
+        analysis on first access to any of its results, after which they're
+        found normally.
+        """
+        if name in self._ANALYSIS_ATTRIBUTES:
+            self.generate_transition_matrix()
+            return self.__dict__[name]
+        raise AttributeError(name)
 
     def generate_transition_matrix(self):
         """
@@ -94,16 +111,16 @@ class LSystemFractal(LSystemFractalTuple):
         # TODO: probably we could do a little static analysis here in order to
         #       not consider symbols with no impact, although that's a little
         #       too on the graph theoretic side for now, methinks
-        t = DummyTurtle()
-        draw_rules = self.draw_rules(t, 1)
         # Extract symbols from rules. This allows passing in redundant drawing
         # rules without performance penalty (which is useful if you just
         # maintain a standard ruleset), and further takes place entirely
         # statically, with no mocking.
         # This paragraph of justification is here because obviously it also
         # works to just take the set of keys for draw_rules.
-        self.symbols = list(set(chain(self.axiom,
-                                      *starmap(chain, self.rules.items()))))
+        # They're sorted so that the order doesn't depend on the interpreter's
+        # hashing.
+        self.symbols = sorted(set(chain(self.axiom,
+                                        *starmap(chain, self.rules.items()))))
         # I don't even know if Python 2 has dictionary comprehensions, and I
         # don't really want to find out
         rule_counter = dict((symbol, Counter(self.rules.get(symbol, symbol)))
@@ -115,7 +132,13 @@ class LSystemFractal(LSystemFractalTuple):
         initial_counter = Counter(self.axiom)
         self.initial_vector = Matrix([[initial_counter[symbol]] for symbol in
                 self.symbols])
-        self.symbol_steps = [draw_rules[symbol]() for symbol in self.symbols]
+        if hasattr(self.draw_rules, "symbol_steps"):
+            steps = self.draw_rules.symbol_steps
+            self.symbol_steps = [steps[symbol] for symbol in self.symbols]
+        else:
+            draw_rules = self.draw_rules(DummyTurtle(), 1)
+            self.symbol_steps = [draw_rules[symbol]()
+                                 for symbol in self.symbols]
 
     def project_steps(self, iterations):
         """
@@ -129,35 +152,98 @@ class LSystemFractal(LSystemFractalTuple):
                 self.transition_matrix ** iterations * self.initial_vector
                 ).array[0][0]
 
-    def generate(self, depth):
+    def generate(self, depth, stats=None):
         """
         Lazy generator that actually performs the substitution. It does so
         lazily, so it effectively needs to store only a call stack of the size
-        of the depth.
+        of the depth. If a DrawStats object is given, the number of rewritten
+        symbols is counted in it.
         """
         if depth <= 0:
             for sym in self.axiom:
                 yield sym
-        else:
+        elif stats is None:
             for sym in self.generate(depth - 1):
                 for gen_sym in self.rules.get(sym, sym):
                     yield gen_sym
+        else:
+            for sym in self.generate(depth - 1, stats):
+                stats.rewrites += 1
+                for gen_sym in self.rules.get(sym, sym):
+                    yield gen_sym
 
-    def draw(self, turtle, depth, w):
+    def draw(self, turtle, depth, w, stats=None, symbols=None):
         """
         Return a generator that draws the fractal, that yields for every line
-        drawn.
+        drawn, giving the number of steps taken so far. If a DrawStats object is given, the drawing is instrumented,
+        which slows it down somewhat. The turtle should be given the same
+        DrawStats object to count its own activity. The symbols to draw are
+        usually generated on the fly, but an iterable of them can be passed in
+        instead, eg from a GenerationStore.
+        """
+        if symbols is None:
+            symbols = self.generate(depth, stats)
+        if stats is None:
+            return self._draw(turtle, depth, w, symbols)
+        return self._draw_instrumented(turtle, depth, w, stats, symbols)
+
+    def _prepare_draw(self, turtle, depth, w):
+        """
+        Set up the turtle for drawing, and return the projected number of steps
+        and the draw rules.
         """
         expected_steps = self.project_steps(depth)
         draw_rules = self.draw_rules(turtle, depth)
         turtle.input_rescale(self.size_func(depth))
         turtle.output_rescale(w)
-        times_moved = 0
-        for symbol in self.generate(depth):
+        return expected_steps, draw_rules
+
+    def _draw(self, turtle, depth, w, symbols):
+        expected_steps, draw_rules = self._prepare_draw(turtle, depth, w)
+        return self._draw_symbols(turtle, expected_steps, draw_rules, symbols)
+
+    def _draw_symbols(self, turtle, expected_steps, draw_rules, symbols,
+                      times_moved=0):
+        """
+        The drawing loop itself, for already prepared draw rules. Drawing can
+        be picked up part way through, by passing in the remaining symbols and
+        the number of steps already taken, which sets the hue.
+        """
+        for symbol in symbols:
             turtle.sethue(255.0 * times_moved / expected_steps)
             for _ in xrange(draw_rules[symbol]()):
                 times_moved += 1
-                yield
+                yield times_moved
+
+    def _draw_instrumented(self, turtle, depth, w, stats, symbols):
+        """
+        Equivalent to _draw, but fills in `stats` as it goes. Time spent
+        suspended at a yield isn't counted towards anything.
+        """
+        expected_steps, draw_rules = self._prepare_draw(turtle, depth, w)
+        times_moved = 0
+        symbols = iter(symbols)
+        while True:
+            start = timer()
+            try:
+                symbol = next(symbols)
+            except StopIteration:
+                stats.generation_time += timer() - start
+                break
+            generated = timer()
+            stats.generation_time += generated - start
+            graphics_time = stats.graphics_time
+            turtle.sethue(255.0 * times_moved / expected_steps)
+            steps = draw_rules[symbol]()
+            stats.turtle_time += (timer() - generated
+                                  - (stats.graphics_time - graphics_time))
+            stats.symbols += 1
+            if not steps:
+                stats.idle_symbols += 1
+            for _ in xrange(steps):
+                times_moved += 1
+                stats.steps += 1
+                yield times_moved
 
     def __str__(self):
         return dedent("""\
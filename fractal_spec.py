@@ -0,0 +1,383 @@
+"""
+Declarative specifications of L-system fractals, as plain data that can be
+stored as JSON, hashed, and sent to other processes. A spec is a dictionary
+with the following keys:
+
+name:            The name of the fractal.
+axiom:           Initial string.
+rules:           Rewriting rules, as a dictionary of strings to strings.
+size:            Expression for the size of the fractal, as in the size_func
+                 of LSystemFractal.
+iterations:      The default number of iterations.
+angle:           Angle for "+" and "-" (default 90).
+initial_pos:     Pair giving the position set by "0" (default [0, 0]).
+initial_heading: Heading set by "0" (default 0).
+ops:             Extra draw rules, as a dictionary mapping each symbol to a
+                 list of turtle calls. Each call is a list of a turtle method
+                 name and its arguments, eg {"_": [["fjump", "-1.5 * d"]]}.
+                 A symbol counts as drawing as many steps as it has "forward"
+                 calls. An empty list makes a symbol do nothing.
+custom_ops:      The name of a set of draw rules from `custom_ops`, for rules
+                 that can't be expressed as a list of turtle calls.
+
+Anywhere a number is expected, an expression in the depth `d` can be given as
+a string instead, which can use the functions in `spec_functions`. For example
+an angle that changes sign with each iteration is "(-1) ** d * 60". These are
+parsed rather than passed to eval(), and may only contain numbers, the
+operators + - * / ** %, parentheses, `d`, and names and calls from
+`spec_functions`, so a spec can't run arbitrary code.
+
+The draw rules are the standard set from standard_rules(), with any `ops` and
+`custom_ops` layered on top.
+"""
+
+from __future__ import division
+
+import ast
+import hashlib
+import json
+import operator
+from math import sqrt, pi, sin, cos
+from numbers import Number
+
+from fractal_base import LSystemFractal
+from matrix import Matrix
+
+def draw(*args):
+    """
+    Dummy function that returns 1, for nicer semantics in defining L systems.
+    You pass each thing you want to be executed as an argument. Generally I've
+    favoured lambda functions over functools.partial because I think they're
+    cooler.
+    """
+    return 1
+
+def nodraw(*args):
+    """
+    Similar to draw(). With no arguments, can act as a no-op
+    """
+    return 0
+
+def standard_rules(t, angle=90, initial_pos=(0, 0), initial_heading=0,
+        additions={}):
+    """
+    Provide the "standard" rule set, given the angle and the turtle and depth
+    arguments. Can also append further rules, which may override standard rules.
+    Also defines a "0" symbol, the function of which can be modified with the
+    `initial_pos` and `initial_heading` parameters.
+
+    This is basically a nonstandard helper function to hugely shorten the
+    definition of each fractal.
+    """
+    rules = {"F": lambda: draw(t.forward(1)),
+             "G": lambda: draw(t.forward(1)),
+             "H": lambda: draw(t.forward(1)),
+             "f": lambda: nodraw(t.fjump(1)),
+             "g": lambda: nodraw(t.fjump(1)),
+             "h": lambda: nodraw(t.fjump(1)),
+             "-": lambda: nodraw(t.turn_degrees(-angle)),
+             "+": lambda: nodraw(t.turn_degrees(angle)),
+             "|": lambda: nodraw(t.turn_degrees(180)),
+             "[": lambda: nodraw(t.save_state()),
+             "]": lambda: nodraw(t.restore_state()),
+             "X": nodraw,
+             "Y": nodraw,
+             "Z": nodraw,
+             "0": lambda: nodraw(t.jump(*initial_pos),
+                                 t.setheading_degrees(initial_heading))}
+    rules.update(additions)
+    return rules
+
+# The number of steps each of the standard rules takes
+standard_steps = dict((symbol, 1 if symbol in "FGH" else 0)
+                      for symbol in "FGHfgh-+|[]XYZ0")
+
+class FibonacciWordRules(dict):
+    """
+    Draw rules for the Fibonacci word fractal, which needs to keep track of the
+    parity of the index of each symbol. This is a dictionary of draw rules like
+    any other, but the parity can also be saved and restored with get_state()
+    and set_state(), so that a drawing can be checkpointed.
+    """
+    symbol_steps = {"F": 1, "G": 1}
+
+    def __init__(self, t):
+        super(FibonacciWordRules, self).__init__(F=self.F, G=self.G)
+        self.t = t
+        self.ind_is_odd = False
+
+    def F(self):
+        self.ind_is_odd = not self.ind_is_odd
+        if self.ind_is_odd:
+            return draw(self.t.forward(1), self.t.turn_degrees(+90))
+        else:
+            return draw(self.t.forward(1), self.t.turn_degrees(-90))
+
+    def G(self):
+        self.ind_is_odd = not self.ind_is_odd
+        return draw(self.t.forward(1))
+
+    def get_state(self):
+        return self.ind_is_odd
+
+    def set_state(self, state):
+        self.ind_is_odd = state
+
+def fibo_rules(t):
+    """
+    Draw rules for the Fibonacci word fractal.
+    """
+    return FibonacciWordRules(t)
+
+def fibo_dim(n):
+    """
+    Calculate dimensions of Fibonacci word fractals. See
+    fibonacci/investigate.py.
+    """
+    if n % 3 == 0:
+        return (Matrix([ [0, 1], [1, 2] ]) ** (n // 3)
+                * Matrix([[1], [3]])).array[0][0]
+    elif n % 3 == 2:
+        return (Matrix([ [0, 1], [1, 2] ]) ** (n // 3)
+                * Matrix([[2], [5]])).array[0][0]
+    else:
+        return (Matrix([ [0, 1], [1, 2] ]) ** (n // 3)
+                * Matrix([[2], [5]])).array[0][0] - 1
+
+# Named sets of draw rules that specs can refer to with "custom_ops". Each is a
+# function of the turtle, returning a dictionary of draw rules, and has a
+# `symbol_steps` attribute giving the number of steps each rule takes. If the
+# rules have state of their own, the dictionary should also have get_state()
+# and set_state() methods, with the state being something that can go in JSON.
+custom_ops = {"fibonacci_word": FibonacciWordRules}
+
+# Functions and constants available to expressions in specs
+spec_functions = {"sqrt": sqrt, "pi": pi, "sin": sin, "cos": cos,
+                  "fibo_dim": fibo_dim}
+
+# Turtle methods that can be used in "ops"
+OP_METHODS = frozenset("""forward fjump jump turn_degrees setheading_degrees
+                          save_state restore_state""".split())
+
+REQUIRED_KEYS = frozenset("name axiom rules size iterations".split())
+OPTIONAL_KEYS = frozenset(
+        "angle initial_pos initial_heading ops custom_ops".split())
+
+# Operators allowed in expressions in specs
+BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub,
+                    ast.Mult: operator.mul, ast.Div: operator.truediv,
+                    ast.Pow: operator.pow, ast.Mod: operator.mod}
+UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+# Number literals are ast.Num up to Python 3.7, and ast.Constant after
+NUMBER_NODES = tuple(getattr(ast, name) for name in ("Num", "Constant")
+                     if hasattr(ast, name))
+
+ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name,
+                 ast.Load) + NUMBER_NODES + tuple(BINARY_OPERATORS) \
+                + tuple(UNARY_OPERATORS)
+
+# Parsed expressions, as the same few get evaluated every time a fractal is
+# drawn
+_parsed_expressions = {}
+
+def parse_expression(expression):
+    """
+    Parse an expression from a spec, raising a ValueError if it uses anything
+    other than what's allowed (see the module docstring).
+    """
+    if expression in _parsed_expressions:
+        return _parsed_expressions[expression]
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError("can't parse {!r}: {}".format(expression, e))
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            problem = type(node).__name__
+        elif isinstance(node, NUMBER_NODES):
+            value = getattr(node, "n", getattr(node, "value", None))
+            problem = (None if isinstance(value, Number)
+                       and not isinstance(value, bool) else repr(value))
+        elif isinstance(node, ast.Name):
+            problem = (None if node.id == "d" or node.id in spec_functions
+                       else "name {!r}".format(node.id))
+        elif isinstance(node, ast.Call):
+            problem = (None if isinstance(node.func, ast.Name)
+                       and callable(spec_functions.get(node.func.id))
+                       and not node.keywords
+                       and not getattr(node, "starargs", None)
+                       and not getattr(node, "kwargs", None)
+                       else "call")
+        else:
+            problem = None
+        if problem is not None:
+            raise ValueError("{} not allowed in expression {!r}".format(
+                problem, expression))
+    _parsed_expressions[expression] = tree.body
+    return tree.body
+
+def _evaluate_node(node, d):
+    if isinstance(node, NUMBER_NODES):
+        return getattr(node, "n", getattr(node, "value", None))
+    if isinstance(node, ast.Name):
+        return d if node.id == "d" else spec_functions[node.id]
+    if isinstance(node, ast.BinOp):
+        return BINARY_OPERATORS[type(node.op)](_evaluate_node(node.left, d),
+                                               _evaluate_node(node.right, d))
+    if isinstance(node, ast.UnaryOp):
+        return UNARY_OPERATORS[type(node.op)](_evaluate_node(node.operand, d))
+    return spec_functions[node.func.id](
+            *[_evaluate_node(arg, d) for arg in node.args])
+
+def evaluate(value, d):
+    """
+    Evaluate a number or expression from a spec at depth `d`.
+    """
+    if isinstance(value, Number):
+        return value
+    return _evaluate_node(parse_expression(value), d)
+
+def spec_expressions(spec):
+    """
+    Generate every number or expression in a spec.
+    """
+    for key in "angle", "initial_heading", "size":
+        if key in spec:
+            yield spec[key]
+    for value in spec.get("initial_pos", ()):
+        yield value
+    for calls in spec.get("ops", {}).values():
+        for call in calls:
+            for arg in call[1:]:
+                yield arg
+
+def op_steps(calls):
+    """
+    The number of steps taken by a list of turtle calls from a spec.
+    """
+    return sum(1 for call in calls if call[0] == "forward")
+
+def make_op(t, calls, d):
+    """
+    Turn a list of turtle calls from a spec into a draw rule.
+    """
+    steps = op_steps(calls)
+    calls = [(getattr(t, call[0]), [evaluate(arg, d) for arg in call[1:]])
+             for call in calls]
+    def op():
+        for method, args in calls:
+            method(*args)
+        return steps
+    return op
+
+class DrawRuleTable(dict):
+    """
+    The draw rules for a fractal compiled from a spec. This keeps hold of the
+    custom ops, if there are any, so that their state can be saved and
+    restored.
+    """
+    def __init__(self, rules, custom=None):
+        super(DrawRuleTable, self).__init__(rules)
+        self.custom = custom
+
+    def get_state(self):
+        if hasattr(self.custom, "get_state"):
+            return self.custom.get_state()
+        return None
+
+    def set_state(self, state):
+        if hasattr(self.custom, "set_state"):
+            self.custom.set_state(state)
+
+class CompiledDrawRules(object):
+    """
+    The draw_rules of a fractal compiled from a spec. Unlike a lambda, this
+    can be pickled, as it only holds on to the spec itself.
+
+    The number of steps each rule takes is known from the spec, and is given
+    by `symbol_steps`, so the fractal can be analysed without calling any
+    rules.
+    """
+    def __init__(self, spec):
+        self.spec = spec
+        self.symbol_steps = dict(standard_steps)
+        if "custom_ops" in spec:
+            self.symbol_steps.update(
+                    custom_ops[spec["custom_ops"]].symbol_steps)
+        for symbol, calls in spec.get("ops", {}).items():
+            self.symbol_steps[symbol] = op_steps(calls)
+
+    def __call__(self, t, d):
+        spec = self.spec
+        additions = {}
+        custom = None
+        if "custom_ops" in spec:
+            custom = custom_ops[spec["custom_ops"]](t)
+            additions.update(custom)
+        for symbol, calls in spec.get("ops", {}).items():
+            additions[symbol] = make_op(t, calls, d)
+        return DrawRuleTable(standard_rules(t,
+                evaluate(spec.get("angle", 90), d),
+                tuple(evaluate(c, d) for c in spec.get("initial_pos", (0, 0))),
+                evaluate(spec.get("initial_heading", 0), d),
+                additions), custom)
+
+class SizeExpression(object):
+    """
+    The size_func of a fractal compiled from a spec, which can be pickled.
+    """
+    def __init__(self, expression):
+        self.expression = expression
+
+    def __call__(self, d):
+        return evaluate(self.expression, d)
+
+def validate_spec(spec):
+    """
+    Check that a spec has everything it needs, and nothing it doesn't, raising
+    a ValueError if not.
+    """
+    missing = REQUIRED_KEYS - set(spec)
+    if missing:
+        raise ValueError("spec is missing {}".format(
+            ", ".join(sorted(missing))))
+    unknown = set(spec) - REQUIRED_KEYS - OPTIONAL_KEYS
+    if unknown:
+        raise ValueError("unknown keys in spec for {!r}: {}".format(
+            spec["name"], ", ".join(sorted(unknown))))
+    if "custom_ops" in spec and spec["custom_ops"] not in custom_ops:
+        raise ValueError("unknown custom ops {!r}".format(spec["custom_ops"]))
+    for symbol, calls in spec.get("ops", {}).items():
+        for call in calls:
+            if call[0] not in OP_METHODS:
+                raise ValueError("unknown turtle method {!r} for {!r}".format(
+                    call[0], symbol))
+    for value in spec_expressions(spec):
+        if not isinstance(value, Number):
+            parse_expression(value)
+
+def compile_spec(spec):
+    """
+    Build an LSystemFractal from a spec. The spec stays available as
+    `fractal.draw_rules.spec`.
+    """
+    validate_spec(spec)
+    return LSystemFractal(spec["name"], spec["axiom"], spec["rules"],
+                          CompiledDrawRules(spec), SizeExpression(spec["size"]),
+                          spec["iterations"])
+
+def spec_hash(spec):
+    """
+    A stable hash of a spec's contents, suitable for use as a cache key. This
+    doesn't depend on dictionary ordering or the interpreter.
+    """
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def load_specs(path):
+    """
+    Load a list of specs from a JSON file, and compile them.
+    """
+    with open(path) as f:
+        return [compile_spec(spec) for spec in json.load(f)]
@@ -0,0 +1,411 @@
+"""
+Materialise generations of an L-system to disk, for the ones that are too big
+to want to derive from scratch every time. Generation k is stored as one byte
+per symbol (the symbol's own character code), optionally run-length encoded,
+and generation k + 1 is made by streaming generation k back through the rules
+in large blocks. Nothing ever needs to be held in memory apart from a block,
+so the size of a generation is limited only by disk space.
+
+In a run-length encoded generation, symbols are still stored as themselves,
+except that a run of at least MIN_RUN copies of a symbol is replaced by the
+ESCAPE byte, the symbol, and the length of the run as a varint (7 bits per
+byte, least significant first, with the top bit set on all but the last
+byte). The ESCAPE byte itself is always stored as a run. So an encoded
+generation is never bigger than the plain one unless it uses the ESCAPE byte,
+and runs are expanded and re-encoded without ever being written out in full.
+
+Generations are read back with mmap where it's available (it isn't in
+Jython), and can be fed into LSystemFractal.draw() in place of its own
+generator, or counted directly.
+
+This can also be run as a script, to materialise and count a generation of
+one of the fractals in the registry:
+
+    pypy3 generation_store.py 0 12 /tmp/sierpinski
+"""
+
+import errno
+import json
+import os
+import re
+import sys
+from argparse import ArgumentParser
+from collections import Counter
+
+from compat import xrange
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+# Bytes read or written in one go
+BLOCK_SIZE = 1 << 20
+
+# Marks the start of a run in a run-length encoded file
+ESCAPE = b"\xff"
+ESCAPE_CODE = 255
+
+# Shortest run that's worth encoding as a run
+MIN_RUN = 8
+
+# Runs of at least MIN_RUN of the same byte. Spelling out the repeats is about
+# twice as fast as a {n,} quantifier.
+RUN_PATTERN = re.compile(b"(.)" + b"\\1" * (MIN_RUN - 2) + b"\\1+", re.DOTALL)
+
+def encode_symbols(string):
+    """
+    Convert a string of symbols to bytes, one per symbol.
+    """
+    if isinstance(string, bytes):
+        # a str on Python 2, which already has a byte per symbol
+        return string
+    try:
+        return string.encode("latin-1")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        raise ValueError("symbols must be single-byte characters: {!r}"
+                         .format(string))
+
+def decode_symbols(data):
+    """
+    Convert bytes back to a string of symbols, as a str on either Python.
+    """
+    if str is bytes:
+        return bytes(data)
+    return bytes(data).decode("latin-1")
+
+def symbols_text(string):
+    """
+    A string of symbols as unicode text, for storing in JSON.
+    """
+    return encode_symbols(string).decode("latin-1")
+
+def encode_run(symbol, length):
+    """
+    Encode `length` copies of the byte with code `symbol` as a run.
+    """
+    encoded = bytearray([ESCAPE_CODE, symbol])
+    while length > 0x7f:
+        encoded.append(0x80 | (length & 0x7f))
+        length >>= 7
+    encoded.append(length)
+    return encoded
+
+def read_varint(data, pos):
+    """
+    Read a varint from a bytearray, returning its value and the position after
+    it, or None if it runs off the end of the data.
+    """
+    value = shift = 0
+    while pos < len(data):
+        byte = data[pos]
+        value |= (byte & 0x7f) << shift
+        pos += 1
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+    return None
+
+class RunLengthWriter(object):
+    """
+    Run-length encodes bytes as they're written, and passes them on to `out`
+    in chunks of about `buffer_size`. Runs can be written directly with
+    write_run(), and runs are merged across writes, so the encoding doesn't
+    depend on how the data is split up. flush() has to be called at the end.
+    """
+    def __init__(self, out, buffer_size=BLOCK_SIZE):
+        self.out = out
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        # The run at the end of what's been written so far, which might
+        # still go on in the next write.
+        self.run_symbol = None
+        self.run_length = 0
+
+    def write(self, data):
+        if not data:
+            return
+        if self.run_length and bytearray(data[:1])[0] == self.run_symbol:
+            # carry on the current run with the matching bytes at the start
+            rest = data.lstrip(data[:1])
+            self.run_length += len(data) - len(rest)
+            data = rest
+            if not data:
+                return
+        self._end_run()
+        last = data[-1:]
+        body = data.rstrip(last)
+        self.run_symbol = bytearray(last)[0]
+        self.run_length = len(data) - len(body)
+        pos = 0
+        for match in RUN_PATTERN.finditer(body):
+            self._literal(body[pos:match.start()])
+            self.buffer += encode_run(bytearray(match.group(1))[0],
+                                      match.end() - match.start())
+            pos = match.end()
+        self._literal(body[pos:])
+        self._spill()
+
+    def write_run(self, symbol, length):
+        """
+        Write `length` copies of the byte with code `symbol`.
+        """
+        if not length:
+            return
+        if symbol != self.run_symbol:
+            self._end_run()
+            self.run_symbol = symbol
+        self.run_length += length
+
+    def _literal(self, data):
+        self.buffer += data.replace(ESCAPE, bytes(encode_run(ESCAPE_CODE, 1)))
+
+    def _end_run(self):
+        if self.run_length >= MIN_RUN or self.run_symbol == ESCAPE_CODE:
+            self.buffer += encode_run(self.run_symbol, self.run_length)
+        elif self.run_length:
+            self.buffer += bytearray([self.run_symbol]) * self.run_length
+        self.run_symbol = None
+        self.run_length = 0
+        self._spill()
+
+    def _spill(self):
+        if len(self.buffer) >= self.buffer_size:
+            self.out.write(self.buffer)
+            self.buffer = bytearray()
+
+    def flush(self):
+        self._end_run()
+        self.out.write(self.buffer)
+        self.buffer = bytearray()
+
+def rle_decode(blocks):
+    """
+    Decode run-length encoded blocks, generating (literal, symbol, length)
+    triples: a bytearray of symbols to be taken as they are, followed by a run
+    of `length` copies of the byte with code `symbol`. The length is 0 when
+    there's no run to follow. Runs can be split across blocks.
+    """
+    carry = bytearray()
+    for block in blocks:
+        data = carry + bytearray(block)
+        carry = bytearray()
+        pos = 0
+        while True:
+            esc = data.find(ESCAPE, pos)
+            varint = None if esc == -1 else read_varint(data, esc + 2)
+            if varint is None:
+                if esc == -1:
+                    yield data[pos:], None, 0
+                else:
+                    yield data[pos:esc], None, 0
+                    carry = data[esc:]
+                break
+            length, end = varint
+            yield data[pos:esc], data[esc + 1], length
+            pos = end
+    if carry:
+        raise ValueError("run-length encoded data ends part way through a run")
+
+class GenerationStore(object):
+    """
+    A directory of materialised generations of a fractal. A manifest of the
+    axiom and rules is kept alongside, so that generations of one L-system
+    can't be mistaken for generations of another.
+    """
+    def __init__(self, fractal, directory, rle=False, block_size=BLOCK_SIZE):
+        self.fractal = fractal
+        self.directory = directory
+        self.rle = rle
+        self.block_size = block_size
+        # Each byte on its own, and what each byte rewrites to. Symbols
+        # without a rule rewrite to themselves.
+        self.singles = [bytes(bytearray([code])) for code in range(256)]
+        self.table = list(self.singles)
+        for symbol, replacement in fractal.rules.items():
+            self.table[bytearray(encode_symbols(symbol))[0]] = \
+                    encode_symbols(replacement)
+        self._check_manifest()
+
+    def _check_manifest(self):
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        manifest = {"axiom": symbols_text(self.fractal.axiom),
+                    "rules": dict((symbols_text(symbol),
+                                   symbols_text(replacement))
+                                  for symbol, replacement
+                                  in self.fractal.rules.items())}
+        path = os.path.join(self.directory, "manifest.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                if json.load(f) != manifest:
+                    raise ValueError("{} holds generations of a different "
+                                     "L-system".format(self.directory))
+        else:
+            with open(path, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+
+    def path(self, k):
+        return os.path.join(self.directory, "generation-{:03}.{}".format(
+            k, "rle" if self.rle else "sym"))
+
+    def materialize(self, k):
+        """
+        Make sure that generation k is on disk, deriving it and any earlier
+        generations as necessary. Returns the path to the file.
+        """
+        first_missing = k
+        while first_missing >= 0 and not os.path.exists(
+                self.path(first_missing)):
+            first_missing -= 1
+        for j in xrange(first_missing + 1, k + 1):
+            # Write to a temporary file first, so that an interrupted run
+            # doesn't leave behind a truncated generation.
+            tmp_path = self.path(j) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                out = RunLengthWriter(f, self.block_size) if self.rle else f
+                if j == 0:
+                    out.write(encode_symbols(self.fractal.axiom))
+                else:
+                    self._expand(j - 1, out)
+                out.flush()
+            os.rename(tmp_path, self.path(j))
+        return self.path(k)
+
+    def _expand(self, k, out):
+        """
+        Stream generation k through the rules into `out`.
+        """
+        table = self.table
+        if not self.rle:
+            for block in self._read_blocks(k):
+                out.write(b"".join(map(table.__getitem__, bytearray(block))))
+            return
+        for literal, symbol, length in rle_decode(self._read_blocks(k)):
+            if literal:
+                out.write(b"".join(map(table.__getitem__, literal)))
+            if length:
+                self._expand_run(out, table[symbol], length)
+
+    def _expand_run(self, out, replacement, length):
+        """
+        Write `length` copies of `replacement` to a RunLengthWriter, a block
+        at a time.
+        """
+        if not replacement:
+            return
+        if not replacement.lstrip(replacement[:1]):
+            # a run of one symbol just becomes a longer run
+            out.write_run(bytearray(replacement)[0],
+                          length * len(replacement))
+            return
+        copies = max(1, self.block_size // len(replacement))
+        chunk = replacement * min(copies, length)
+        for _ in xrange(length // copies):
+            out.write(chunk)
+        out.write(replacement * (length % copies))
+
+    def _read_blocks(self, k):
+        """
+        Generate the raw contents of the file for generation k, a block at a
+        time.
+        """
+        path = self.materialize(k)
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            if mmap is not None and size > 0:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    for start in xrange(0, size, self.block_size):
+                        yield mapped[start:start + self.block_size]
+                finally:
+                    mapped.close()
+            else:
+                while True:
+                    block = f.read(self.block_size)
+                    if not block:
+                        break
+                    yield block
+
+    def symbol_blocks(self, k):
+        """
+        Generate the symbols of generation k as bytes, a block at a time.
+        """
+        if not self.rle:
+            for block in self._read_blocks(k):
+                yield block
+            return
+        for literal, symbol, length in rle_decode(self._read_blocks(k)):
+            if literal:
+                yield bytes(literal)
+            while length > 0:
+                yield self.singles[symbol] * min(length, self.block_size)
+                length -= self.block_size
+
+    def symbols(self, k):
+        """
+        Generate the symbols of generation k, like LSystemFractal.generate().
+        """
+        for block in self.symbol_blocks(k):
+            for symbol in decode_symbols(block):
+                yield symbol
+
+    def symbol_counts(self, k):
+        """
+        Count each symbol in generation k.
+        """
+        counts = Counter()
+        alphabet = [(symbol, encode_symbols(symbol))
+                    for symbol in self.fractal.symbols]
+        if self.rle:
+            # gather up literals, as there can be a lot of short ones
+            literals = bytearray()
+            for literal, symbol, length in rle_decode(self._read_blocks(k)):
+                literals += literal
+                if length:
+                    counts[decode_symbols(self.singles[symbol])] += length
+                if len(literals) >= self.block_size or symbol is None:
+                    for name, code in alphabet:
+                        counts[name] += literals.count(code)
+                    literals = bytearray()
+        else:
+            for block in self._read_blocks(k):
+                for symbol, code in alphabet:
+                    counts[symbol] += block.count(code)
+        return counts
+
+    def count_steps(self, k):
+        """
+        Count the number of drawing steps in generation k. This should agree
+        with LSystemFractal.project_steps().
+        """
+        counts = self.symbol_counts(k)
+        return sum(counts[symbol] * steps for symbol, steps in
+                   zip(self.fractal.symbols, self.fractal.symbol_steps))
+
+def main(argv=None):
+    from fractals import fractal_registry
+    parser = ArgumentParser(
+            description="Materialise a generation of a fractal to disk")
+    parser.add_argument("fractal", type=int,
+            help="index of the fractal in the registry")
+    parser.add_argument("depth", type=int, help="generation to materialise")
+    parser.add_argument("directory", help="where to keep the generations")
+    parser.add_argument("--rle", action="store_true",
+            help="run-length encode the generations")
+    args = parser.parse_args(argv)
+
+    fractal = fractal_registry[args.fractal]
+    store = GenerationStore(fractal, args.directory, args.rle)
+    print("materialised {}".format(store.materialize(args.depth)))
+    counts = store.symbol_counts(args.depth)
+    print("{} symbols: {}".format(sum(counts.values()), dict(counts)))
+    print("{} steps (projected {})".format(store.count_steps(args.depth),
+                                           fractal.project_steps(args.depth)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Counters and timers to find out where the time goes when drawing a fractal.
+Nothing in here is used unless a DrawStats is explicitly passed in to
+LSystemFractal.draw() and the ProcessingTurtle, so it costs nothing when
+switched off.
+"""
+
+import errno
+import json
+import os
+from timeit import default_timer as timer
+
+class DrawStats(object):
+    """
+    A bag of counters for a single drawing of a fractal. Mostly filled in by
+    LSystemFractal.draw() and the ProcessingTurtle.
+    symbols:        symbols consumed from the expander
+    idle_symbols:   symbols that didn't draw anything
+    rewrites:       symbols rewritten by the expander, summed over all levels
+    steps:          drawing steps taken
+    lines:          calls to line() on the graphics object
+    stroke_changes: calls to stroke() on the graphics object
+    pushes, pops:   turtle state saves and restores
+    generation_time, turtle_time, graphics_time:
+                    seconds spent in the expander, in the draw rules and
+                    turtle, and in calls to the graphics object respectively.
+                    The turtle time excludes the graphics time.
+    """
+    COUNTERS = """symbols idle_symbols rewrites steps lines stroke_changes
+                  pushes pops""".split()
+    TIMERS = "generation_time turtle_time graphics_time".split()
+
+    def __init__(self, name=None):
+        self.name = name
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+        for t in self.TIMERS:
+            setattr(self, t, 0.0)
+
+    def as_dict(self):
+        d = dict((field, getattr(self, field))
+                 for field in self.COUNTERS + self.TIMERS)
+        d["name"] = self.name
+        return d
+
+    def summary_lines(self):
+        """
+        A short human-readable summary, as a list of lines.
+        """
+        return [
+            "symbols: {} ({} idle)".format(self.symbols, self.idle_symbols),
+            "rewrites: {}".format(self.rewrites),
+            "steps: {}".format(self.steps),
+            "lines: {}".format(self.lines),
+            "stroke changes: {}".format(self.stroke_changes),
+            "push/pop: {}/{}".format(self.pushes, self.pops),
+            "generation: {:.3f}s".format(self.generation_time),
+            "turtle: {:.3f}s".format(self.turtle_time),
+            "graphics: {:.3f}s".format(self.graphics_time)]
+
+    def dump(self, path):
+        """
+        Write the stats to a file as JSON, creating its directory if need be.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            try:
+                os.makedirs(directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2, sort_keys=True)
+
+    def __str__(self):
+        return "\n".join(["DrawStats: {}".format(self.name)]
+                         + self.summary_lines())
+
+class InstrumentedGraphics(object):
+    """
+    Wrapper around a graphics object that counts and times the calls the
+    turtle makes to it, and passes everything else straight through.
+    """
+    def __init__(self, graphics, stats):
+        self.graphics = graphics
+        self.stats = stats
+
+    def line(self, *args):
+        start = timer()
+        self.graphics.line(*args)
+        self.stats.graphics_time += timer() - start
+        self.stats.lines += 1
+
+    def stroke(self, *args):
+        start = timer()
+        self.graphics.stroke(*args)
+        self.stats.graphics_time += timer() - start
+        self.stats.stroke_changes += 1
+
+    def __getattr__(self, name):
+        return getattr(self.graphics, name)
@@ -3,7 +3,9 @@ Provides the Matrix class
 """
 
 from operator import mul
-from itertools import starmap, chain, repeat, izip
+from itertools import starmap, chain, repeat
+
+from compat import izip, xrange
 
 def intersperse_it(_it, int_it):
     """
@@ -111,14 +113,14 @@ class Matrix(object):
 
 # test if the Matrix class is roughly working
 if __name__ == "__main__":
-    print Matrix.identity(1)
-    print Matrix.identity(2)
-    print Matrix.identity(3)
-    print Matrix([ [1234, 342], [13, 3453] ]) * Matrix([ [1, 0], [0, 1] ])
-    print (Matrix([ [1, 2], [3, 4] ]) ** 10).spaced_str()
-    print (Matrix([ [1, 2, 3, 4] ])
-         * Matrix([ [9, 10], [11, 12], [13, 14], [15, 16] ])).spaced_str(2)
-    print (Matrix([ [1, 2, 3, 4], [5, 6, 7, 8] ])
-         * Matrix([ [9], [11], [13], [15] ])).spaced_str(3)
-    print Matrix([ [1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12] ])
-    print repr(Matrix([ [1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12] ]))
+    print(Matrix.identity(1))
+    print(Matrix.identity(2))
+    print(Matrix.identity(3))
+    print(Matrix([ [1234, 342], [13, 3453] ]) * Matrix([ [1, 0], [0, 1] ]))
+    print((Matrix([ [1, 2], [3, 4] ]) ** 10).spaced_str())
+    print((Matrix([ [1, 2, 3, 4] ])
+         * Matrix([ [9, 10], [11, 12], [13, 14], [15, 16] ])).spaced_str(2))
+    print((Matrix([ [1, 2, 3, 4], [5, 6, 7, 8] ])
+         * Matrix([ [9], [11], [13], [15] ])).spaced_str(3))
+    print(Matrix([ [1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12] ]))
+    print(repr(Matrix([ [1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12] ])))
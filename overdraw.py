@@ -0,0 +1,26 @@
+"""
+Report how much of each fractal is overdraw, ie lines that retrace a line that
+has already been drawn. Runs without Processing, using a DedupTurtle on a
+NullGraphics.
+"""
+
+from collections import deque
+
+from drawing import DedupTurtle, NullGraphics
+from fractals import fractal_registry
+
+def overdraw(fractal, depth):
+    """
+    Draw a fractal headlessly and return the turtle, which has counted up the
+    drawn and skipped lines.
+    """
+    turtle = DedupTurtle(NullGraphics())
+    deque(fractal.draw(turtle, depth, 1), maxlen=0)
+    return turtle
+
+if __name__ == "__main__":
+    for ind, fractal in enumerate(fractal_registry):
+        turtle = overdraw(fractal, fractal.iterations)
+        print("{:2}: {:5.1f}% overdraw ({} of {} lines) {}".format(
+            ind, 100 * turtle.overdraw_ratio(), turtle.lines_skipped,
+            turtle.lines_drawn + turtle.lines_skipped, fractal.name))
@@ -0,0 +1,191 @@
+"""
+Asynchronous frame recording, for making videos. Encoding a large frame as a
+PNG takes longer than drawing it, so frames are handed off to a bounded pool
+of writer threads instead, and the animation only has to wait for them when
+the backlog is full. Under Jython these are real Java threads, so the encoding
+genuinely happens in parallel.
+
+Frames are opaque to the recorder - they're just passed on to a sink, which
+knows what to do with them. When the caller knows that a frame is identical to
+the previous one (eg while pausing between fractals), it can record a repeat,
+which the sink stores as a reference rather than encoding it again.
+"""
+
+import errno
+import os
+import shutil
+import threading
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+def make_parent_directory(path):
+    directory = os.path.dirname(path)
+    if directory:
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+class ImageSequenceSink(object):
+    """
+    Saves each frame to its own image file, by calling the frame's save()
+    method (eg a PImage). The file format is decided by the extension in
+    `pattern`, which is formatted with the index of the frame, eg
+    "frames/lsystems-{:013}.png".
+
+    Repeated frames are hard links to the file of the frame they repeat (or
+    copies, if hard links aren't possible). These are made by whichever
+    thread writes the frame being repeated, as soon as it's on disk.
+    """
+    ordered = False
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        make_parent_directory(self.path(0))
+
+    def path(self, index):
+        return self.pattern.format(index)
+
+    def write(self, index, frame):
+        frame.save(self.path(index))
+
+    def write_repeat(self, index, source_index):
+        source, dest = self.path(source_index), self.path(index)
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(source, dest)
+        except (AttributeError, OSError):
+            shutil.copyfile(source, dest)
+
+    def close(self):
+        pass
+
+class RawStreamSink(object):
+    """
+    Writes uncompressed frames back to back into a single file, which skips
+    encoding altogether at the cost of disk space. `to_bytes` should convert a
+    frame to a string of bytes. For example with packed ARGB pixels, a video
+    can be made from the stream with something like
+
+        ffmpeg -f rawvideo -pix_fmt argb -s 1920x1080 -r 60 -i frames.raw \\
+            out.mp4
+
+    Frames have to be written in order, so this only ever uses one writer
+    thread. Repeated frames just write the previous bytes again, without
+    converting anything.
+    """
+    ordered = True
+
+    def __init__(self, path, to_bytes):
+        make_parent_directory(path)
+        self.stream = open(path, "wb")
+        self.to_bytes = to_bytes
+        self.last_frame = None
+
+    def write(self, index, frame):
+        self.last_frame = self.to_bytes(frame)
+        self.stream.write(self.last_frame)
+
+    def write_repeat(self, index, source_index):
+        self.stream.write(self.last_frame)
+
+    def close(self):
+        self.stream.close()
+
+class FrameRecorder(object):
+    """
+    Hands frames off to a pool of `workers` threads, which write them to
+    `sink`. At most `backlog` frames are held in memory waiting to be written,
+    after which record() blocks until there is space, so the recorder can't
+    run away with all of the memory.
+
+    The caller is responsible for passing in a copy of the frame (eg with
+    get() in Processing), as the writer threads can get to it at any time.
+
+    The first exception raised while writing is re-raised by the next call to
+    record(), repeat() or close(), so that recording stops as soon as
+    something goes wrong. close() has to be called to make sure that
+    everything is written.
+    """
+    def __init__(self, sink, workers=2, backlog=8):
+        self.sink = sink
+        self.frame_count = 0
+        self.last_index = None
+        # Repeats of frames that haven't been written yet, keyed by the index
+        # of the frame they repeat. Whoever writes the frame writes these too.
+        self.pending_repeats = {}
+        self.lock = threading.Lock()
+        self.errors = []
+        self.queue = Queue(backlog)
+        self.threads = [threading.Thread(target=self._work)
+                        for _ in range(1 if sink.ordered else workers)]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            func, index, arg = job
+            try:
+                func(index, arg)
+            except Exception as e:
+                self.errors.append(e)
+
+    def _write_frame(self, index, frame):
+        self.sink.write(index, frame)
+        if not self.sink.ordered:
+            with self.lock:
+                repeats = self.pending_repeats.pop(index)
+            for repeat_index in repeats:
+                self.sink.write_repeat(repeat_index, index)
+
+    def _check_errors(self):
+        if self.errors:
+            raise self.errors[0]
+
+    def record(self, frame):
+        """
+        Queue a new frame to be written.
+        """
+        self._check_errors()
+        self.last_index = self.frame_count
+        self.frame_count += 1
+        if not self.sink.ordered:
+            with self.lock:
+                self.pending_repeats[self.last_index] = []
+        self.queue.put((self._write_frame, self.last_index, frame))
+
+    def repeat(self):
+        """
+        Record the last frame again.
+        """
+        self._check_errors()
+        if self.last_index is None:
+            raise ValueError("no frame has been recorded to repeat")
+        index = self.frame_count
+        self.frame_count += 1
+        if not self.sink.ordered:
+            with self.lock:
+                if self.last_index in self.pending_repeats:
+                    self.pending_repeats[self.last_index].append(index)
+                    return
+        self.queue.put((self.sink.write_repeat, index, self.last_index))
+
+    def close(self):
+        """
+        Wait for all frames to be written, and close the sink.
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.sink.close()
+        self._check_errors()
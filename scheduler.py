@@ -0,0 +1,87 @@
+"""
+Sharing out drawing time between several fractals being drawn at once, as in
+the sketch's gallery mode.
+"""
+
+from itertools import islice
+from timeit import default_timer as timer
+
+class ScheduledJob(object):
+    """
+    A drawer (anything that yields once per step, like LSystemFractal.draw()),
+    along with how many steps it's expected to take. `begin` and `end` are
+    optional functions to call before and after each slice of drawing, eg to
+    call beginDraw() and endDraw() on an offscreen graphics object.
+    """
+    def __init__(self, drawer, total_steps, begin=None, end=None):
+        self.drawer = iter(drawer)
+        self.total_steps = total_steps
+        self.begin = begin
+        self.end = end
+        self.steps_taken = 0
+        self.finished = False
+
+    def remaining(self):
+        # Never zero, as the projection can be a little off, and the drawer
+        # isn't finished until it says so.
+        return max(self.total_steps - self.steps_taken, 1)
+
+    def advance(self, steps):
+        """
+        Take up to `steps` steps, and return how many were actually taken.
+        """
+        if self.begin is not None:
+            self.begin()
+        taken = sum(1 for _ in islice(self.drawer, steps))
+        if self.end is not None:
+            self.end()
+        self.steps_taken += taken
+        if taken < steps:
+            self.finished = True
+            self.drawer = None
+        return taken
+
+class FairShareScheduler(object):
+    """
+    Splits a time budget for each frame between a number of jobs, in
+    proportion to the number of steps each has left, so that they all finish
+    at about the same time. The number of steps that fit in the budget is
+    estimated from how long steps have taken in previous frames.
+    """
+    def __init__(self, frame_budget, initial_steps_per_second=10000):
+        self.frame_budget = frame_budget
+        self.seconds_per_step = 1.0 / initial_steps_per_second
+        self.jobs = []
+        self.frames = 0
+
+    def add(self, drawer, total_steps, begin=None, end=None):
+        job = ScheduledJob(drawer, total_steps, begin, end)
+        self.jobs.append(job)
+        return job
+
+    def finished(self):
+        return all(job.finished for job in self.jobs)
+
+    def run_frame(self):
+        """
+        Advance every unfinished job by its share of one frame's budget, and
+        return the jobs that finished during this frame.
+        """
+        active = [job for job in self.jobs if not job.finished]
+        if not active:
+            return []
+        self.frames += 1
+        remaining = sum(job.remaining() for job in active)
+        budget = max(len(active),
+                     int(self.frame_budget / self.seconds_per_step))
+        start = timer()
+        steps_taken = 0
+        for job in active:
+            steps_taken += job.advance(
+                    max(1, budget * job.remaining() // remaining))
+        elapsed = timer() - start
+        if steps_taken:
+            # smooth the estimate a little, as frames vary
+            self.seconds_per_step = (0.5 * self.seconds_per_step
+                                     + 0.5 * elapsed / steps_taken)
+        return [job for job in active if job.finished]
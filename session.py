@@ -0,0 +1,202 @@
+"""
+Draw sessions that can be paused, checkpointed and resumed. A checkpoint is a
+small dictionary that can be dumped as JSON, and resuming from one only takes
+time proportional to the depth of the fractal, rather than replaying
+everything that has been drawn so far. The picture drawn so far isn't part of
+the checkpoint, as that's up to whoever owns the graphics.
+"""
+
+import json
+from collections import deque
+from itertools import chain
+
+from compat import imap, izip, xrange
+from matrix import Matrix
+
+class Expansion(object):
+    """
+    Iterates over the symbols of a generation of an L-system, like
+    LSystemFractal.generate(), but using an explicit stack rather than nested
+    generators. This means its position can be read off at any time as a list
+    of indices, one per level: the index of the symbol being expanded at each
+    level, and at the deepest level the index of the next symbol to yield. An
+    Expansion can then be started again from such a position.
+    """
+    def __init__(self, fractal, depth, position=None):
+        self.rules = fractal.rules
+        self.depth = max(depth, 0)
+        if position is None:
+            position = [0] * (self.depth + 1)
+        elif len(position) != self.depth + 1:
+            raise ValueError("position {!r} doesn't have depth {}".format(
+                position, self.depth))
+        self.indices = list(position)
+        # The string being expanded at each level, along the current path.
+        self.strings = [fractal.axiom]
+        for level in xrange(self.depth):
+            string, ind = self.strings[level], self.indices[level]
+            if ind >= len(string):
+                break
+            self.strings.append(self.rules.get(string[ind], string[ind]))
+        self.finished = False
+        self._settle()
+
+    def _settle(self):
+        """
+        If the current position has run off the end of a string, move on to
+        the next symbol at the deepest level, or mark the expansion finished
+        if there is none.
+        """
+        strings, indices = self.strings, self.indices
+        level = len(strings) - 1
+        while True:
+            if indices[level] >= len(strings[level]):
+                if level == 0:
+                    self.finished = True
+                    return
+                strings.pop()
+                level -= 1
+                indices[level] += 1
+            elif level == self.depth:
+                return
+            else:
+                symbol = strings[level][indices[level]]
+                strings.append(self.rules.get(symbol, symbol))
+                level += 1
+                indices[level] = 0
+
+    def position(self):
+        return list(self.indices)
+
+    def __iter__(self):
+        indices, depth = self.indices, self.depth
+        while not self.finished:
+            string = self.strings[depth]
+            while indices[depth] < len(string):
+                symbol = string[indices[depth]]
+                indices[depth] += 1
+                yield symbol
+            self._settle()
+
+class DrawSession(object):
+    """
+    Draws a fractal, exactly like LSystemFractal.draw(), yielding for each
+    step. In between steps, checkpoint() returns everything needed to pick up
+    where it left off: the position in the expansion, the state of the
+    turtle, the number of steps taken, and the state of the draw rules if they
+    have any (see fractal_spec.DrawRuleTable).
+
+    To resume, make a new DrawSession with a fresh turtle and the checkpoint.
+    Anything the turtle keeps besides its position and state stack (like the
+    lines a DedupTurtle has seen) starts afresh.
+
+    The drawing itself is done by the fractal's own drawing loop, fed from an
+    Expansion, so this draws exactly what draw() would, at the same speed.
+    """
+    def __init__(self, fractal, turtle, depth, w, checkpoint=None):
+        self.fractal = fractal
+        self.turtle = turtle
+        self.depth = depth
+        self.expected_steps, self.draw_rules = fractal._prepare_draw(
+                turtle, depth, w)
+        # Steps left over from a symbol that was interrupted half way through
+        # when the checkpoint was taken. Its lines have already been drawn.
+        resume_steps = 0
+        times_moved = 0
+        if checkpoint is None:
+            self.expansion = Expansion(fractal, depth)
+        else:
+            if (checkpoint["name"] != fractal.name
+                    or checkpoint["depth"] != depth):
+                raise ValueError("checkpoint is for {} at depth {}".format(
+                    checkpoint["name"], checkpoint["depth"]))
+            self.expansion = Expansion(fractal, depth, checkpoint["position"])
+            times_moved = checkpoint["times_moved"]
+            resume_steps = checkpoint["pending_steps"]
+            turtle.set_state(checkpoint["turtle"])
+            if hasattr(self.draw_rules, "set_state"):
+                self.draw_rules.set_state(checkpoint["rules_state"])
+        # The drawing loop yields the number of steps taken, and the last of
+        # these is kept here. Doing this with imap rather than a generator of
+        # our own keeps stepping through a session as quick as draw().
+        self._last_step = deque([times_moved], maxlen=1)
+        start = times_moved + resume_steps
+        steps = chain(xrange(times_moved + 1, start + 1),
+                      fractal._draw_symbols(turtle, self.expected_steps,
+                                            self.draw_rules, self.expansion,
+                                            start))
+        self._steps = imap(self._last_step.append, steps)
+        self._steps_per_level = None
+
+    def steps_started(self):
+        """
+        The total number of steps of all the symbols taken from the expansion
+        so far. Rather than being counted as they go by, this is worked out
+        from the position of the expansion: each symbol before the current one
+        at some level will have been expanded all the way to the bottom, and
+        the number of steps that gives is found with the transition matrix.
+        """
+        fractal, expansion = self.fractal, self.expansion
+        if expansion.finished:
+            return self.expected_steps
+        if self._steps_per_level is None:
+            # the steps from each symbol after each number of rewrites
+            row = Matrix([fractal.symbol_steps])
+            self._steps_per_level = []
+            for _ in xrange(self.depth + 1):
+                self._steps_per_level.append(
+                        dict(izip(fractal.symbols, row.array[0])))
+                row = row * fractal.transition_matrix
+        total = 0
+        for level, (string, ind) in enumerate(izip(expansion.strings,
+                                                   expansion.indices)):
+            steps = self._steps_per_level[self.depth - level]
+            total += sum(steps[symbol] for symbol in string[:ind])
+        return total
+
+    @property
+    def times_moved(self):
+        return self._last_step[0]
+
+    @property
+    def pending_steps(self):
+        """
+        The number of steps of the current symbol still to come.
+        """
+        return self.steps_started() - self.times_moved
+
+    @property
+    def finished(self):
+        return self.expansion.finished
+
+    def __iter__(self):
+        return self._steps
+
+    def __next__(self):
+        return next(self._steps)
+
+    next = __next__
+
+    def checkpoint(self):
+        """
+        Everything needed to resume this session, as something that can go in
+        JSON.
+        """
+        rules_state = None
+        if hasattr(self.draw_rules, "get_state"):
+            rules_state = self.draw_rules.get_state()
+        return {"name": self.fractal.name,
+                "depth": self.depth,
+                "position": self.expansion.position(),
+                "times_moved": self.times_moved,
+                "pending_steps": self.pending_steps,
+                "turtle": self.turtle.get_state(),
+                "rules_state": rules_state}
+
+def save_checkpoint(checkpoint, path):
+    with open(path, "w") as f:
+        json.dump(checkpoint, f)
+
+def load_checkpoint(path):
+    with open(path) as f:
+        return json.load(f)
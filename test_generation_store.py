@@ -0,0 +1,67 @@
+"""
+Checks that materialised generations read back exactly as
+LSystemFractal.generate() makes them, in both formats, with blocks small
+enough to split runs and escapes. Run with
+
+    python -m unittest test_generation_store
+"""
+
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+from fractal_base import LSystemFractal
+from fractals import fractal_registry
+from generation_store import GenerationStore, MIN_RUN
+
+def nothing_drawn(t, d):
+    return dict((symbol, lambda: 0) for symbol in "AB\xff")
+
+# Long runs of "\xff", which is the escape byte of the run-length encoding, as
+# well as short ones, mixed in with other symbols.
+escape_fractal = LSystemFractal(
+        "Escapes", "A\xffB",
+        {"A": "A\xff" + "B" * MIN_RUN, "B": "\xffBA", "\xff": "\xff\xff"},
+        nothing_drawn, lambda d: 1, 6)
+
+class GenerationStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def check_store(self, fractal, depth, **kwargs):
+        expected = list(fractal.generate(depth))
+        store = GenerationStore(fractal, self.directory, **kwargs)
+        self.assertEqual(list(store.symbols(depth)), expected)
+        counts = store.symbol_counts(depth)
+        self.assertEqual(dict((symbol, count) for symbol, count
+                              in counts.items() if count),
+                         dict(Counter(expected)))
+        shutil.rmtree(self.directory)
+
+    def test_escape_byte(self):
+        for rle in False, True:
+            for block_size in 1, 2, 3, 7, 64:
+                self.check_store(escape_fractal, 6, rle=rle,
+                                 block_size=block_size)
+
+    def test_registry(self):
+        for fractal in fractal_registry:
+            depth = min(fractal.iterations, 4)
+            for rle in False, True:
+                self.check_store(fractal, depth, rle=rle, block_size=5)
+
+    def test_step_counts(self):
+        for fractal in fractal_registry[:6]:
+            depth = fractal.iterations
+            store = GenerationStore(fractal, self.directory, rle=True,
+                                    block_size=16)
+            self.assertEqual(store.count_steps(depth),
+                             fractal.project_steps(depth))
+            shutil.rmtree(self.directory)
+
+if __name__ == "__main__":
+    unittest.main()